@@ -11,7 +11,7 @@ from collections import defaultdict
 from dataclasses import dataclass, field, replace
 from datetime import datetime
 from enum import Enum
-from functools import cache, cached_property, total_ordering
+from functools import cache, cached_property, lru_cache, total_ordering
 from pathlib import Path
 from typing import ClassVar, Iterable, Iterator, Optional
 
@@ -116,6 +116,13 @@ class NameDemangler:
         return None
 
 
+@lru_cache(maxsize=65536)
+def _demangle(mangled_name: str) -> Optional[str]:
+    # The same names (e.g. inline functions and template instantiations)
+    # appear in many files, don't demangle them again every time.
+    return NameDemangler.instance().demangle(mangled_name)
+
+
 class SymbolType(Enum):
     """Enumeration for recognized ELF symbol types (STT_* values)."""
 
@@ -312,8 +319,6 @@ def _read_symbols_in_file(
         use_dwarfdump,
     )
 
-    demangler = NameDemangler.instance()
-
     symbols = []
     for symbol in symtab.iter_symbols():
         size = symbol["st_size"]
@@ -325,7 +330,7 @@ def _read_symbols_in_file(
         except Exception:
             section = ""
 
-        demangled = demangler.demangle(symbol.name) if demangle_names else None
+        demangled = _demangle(symbol.name) if demangle_names else None
 
         symbols.append(
             Symbol(
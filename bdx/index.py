@@ -10,10 +10,10 @@ import threading
 from collections import defaultdict
 from collections.abc import Mapping
 from contextlib import contextmanager
-from dataclasses import asdict, dataclass, field
+from dataclasses import asdict, dataclass, field, replace
 from datetime import datetime
 from enum import Enum
-from functools import cache
+from functools import cache, lru_cache
 from pathlib import Path
 from queue import Empty as QueueEmpty
 from queue import Queue
@@ -27,6 +27,7 @@ from typing import (
     Iterator,
     List,
     Optional,
+    TYPE_CHECKING,
     Type,
 )
 
@@ -44,8 +45,23 @@ from bdx.binary import (
 )
 
 # isort: on
+
+if TYPE_CHECKING:
+    from bdx.query_parser import QueryParser
+
 MAX_TERM_SIZE = 244
 
+# Patterns used for tokenizing symbol names.  Single-letter runs can never
+# match any of them, so they can all be run on the raw symbol name.
+_LETTERS_RE = re.compile("[a-zA-Z]{2,}")
+_CAMEL_CASE_RE = re.compile("[A-Z][a-z]+")
+_UPPER_CASE_RE = re.compile("[A-Z]{2,}")
+_LOWER_CASE_RE = re.compile("[a-z]{2,}")
+_NUMBERS_RE = re.compile("[0-9]+")
+_WORDS_WITH_NUMBERS_RE = re.compile("[a-zA-Z]+[0-9]+")
+_DELETE_DIGITS_TABLE = str.maketrans("", "", "0123456789")
+_HEX_DIGITS = frozenset("0123456789abcdefABCDEF")
+
 
 @dataclass
 class IndexingOptions:
@@ -115,6 +131,14 @@ class DatabaseField:
         else:
             return xapian.Query(term)
 
+    def query_uses_filesystem(self, value: str) -> bool:
+        """Return true if ``make_query`` for ``value`` reads the filesystem.
+
+        Such queries may change between calls, even for the same value.
+
+        """
+        return False
+
 
 class TextField(DatabaseField):
     """A database field that indexes text."""
@@ -150,6 +174,13 @@ class IntegerField(DatabaseField):
         """Index ``value`` in the ``document``."""
         document.add_value(self.slot, self.preprocess_value(value))
 
+    @staticmethod
+    def _is_int(value: str) -> bool:
+        if value.startswith("0x"):
+            digits = value[2:]
+            return bool(digits) and _HEX_DIGITS.issuperset(digits)
+        return value.isascii() and value.isdigit()
+
     @staticmethod
     def _value_to_int(value: str) -> int:
         if value.startswith("0x"):
@@ -166,21 +197,18 @@ class IntegerField(DatabaseField):
             wildcard: Unused.
 
         """
-        hex_number = "(?:0x(?:[0-9a-fA-F])+)"
-        dec_number = "(?:[0-9]+)"
-        number = f"({hex_number}|{dec_number})"
+        start, separator, end = value.partition("..")
+        if separator:
+            eq = ""
+        else:
+            start, end, eq = "", "", value
 
-        match = re.match(
-            f"^{number}?[.][.]{number}?|{number}?$",
-            value,
-        )
-        if not match:
+        numbers = [x for x in (start, end, eq) if x]
+        if not all(map(self._is_int, numbers)):
             msg = f"Invalid integer range value: {value}"
             raise ValueError(msg)
 
-        start, end, eq = match.groups()
-
-        if eq is not None:
+        if eq:
             # Exact value
             v = self.preprocess_value(self._value_to_int(eq))
             return xapian.Query(
@@ -189,20 +217,20 @@ class IntegerField(DatabaseField):
                 v,
                 v,
             )
-        elif start is not None and end is not None:
+        elif start and end:
             return xapian.Query(
                 xapian.Query.OP_VALUE_RANGE,
                 self.slot,
                 (self.preprocess_value(self._value_to_int(start))),
                 (self.preprocess_value(self._value_to_int(end))),
             )
-        elif start is not None:
+        elif start:
             return xapian.Query(
                 xapian.Query.OP_VALUE_GE,
                 self.slot,
                 (self.preprocess_value(self._value_to_int(start))),
             )
-        elif end is not None:
+        elif end:
             return xapian.Query(
                 xapian.Query.OP_VALUE_LE,
                 self.slot,
@@ -252,6 +280,10 @@ class PathField(DatabaseField):
 
         return query
 
+    def query_uses_filesystem(self, value: str) -> bool:
+        """Return true if ``value`` is a path resolved on the filesystem."""
+        return not value.startswith("/")
+
 
 class RelocationsField(DatabaseField):
     """Represents a field for the list of relocations in a given symbol."""
@@ -269,34 +301,60 @@ class SymbolNameField(TextField):
     """DatabaseField that indexes symbol names specially."""
 
     @staticmethod
-    def tokenize_value(value: str) -> set[str]:
-        """Split given value into tokens for indexing."""
-        letters_only = re.findall("[a-zA-Z]{2,}", value)
+    def tokenize_iter(value: str) -> Iterator[str]:
+        """Yield tokens of given value, possibly with duplicates."""
+        # Fast path for plain lowercase identifiers, like "foo_bar", which
+        # only split on underscores.
+        letters = value.replace("_", "")
+        if letters.isascii() and letters.isalpha() and letters.islower():
+            yield from (word for word in value.split("_") if len(word) > 1)
+            return
 
-        # Split "CamelCaseWord" into "Camel Case Word"
-        camel_case_words = re.findall("[A-Z][a-z]+", " ".join(letters_only))
+        # Check which character classes are present up front, so that
+        # patterns which can't match anything are not run at all.
+        has_upper = value != value.lower()
+        has_lower = value != value.upper()
+        has_digits = value != value.translate(_DELETE_DIGITS_TABLE)
 
-        # Find uppercase words
-        upper_case_words = re.findall("[A-Z]{2,}", " ".join(letters_only))
+        if has_upper or has_lower:
+            yield from _LETTERS_RE.findall(value)
 
-        # Find lowercase words
-        lower_case_words = re.findall("[a-z]{2,}", " ".join(letters_only))
+        if has_upper and has_lower:
+            # Split "CamelCaseWord" into "Camel Case Word"
+            yield from _CAMEL_CASE_RE.findall(value)
 
-        numbers = re.findall("[0-9]+", value)
-        words_with_numbers = re.findall("[a-zA-Z]+[0-9]+", value)
+        if has_upper:
+            # Find uppercase words
+            yield from _UPPER_CASE_RE.findall(value)
 
-        tokens = set()
-        for tokenlist in [
-            letters_only,
-            camel_case_words,
-            upper_case_words,
-            lower_case_words,
-            numbers,
-            words_with_numbers,
-        ]:
-            tokens.update(tokenlist)
+        if has_lower:
+            # Find lowercase words
+            yield from _LOWER_CASE_RE.findall(value)
 
-        return set(tokens)
+        if has_digits:
+            yield from _NUMBERS_RE.findall(value)
+            yield from _WORDS_WITH_NUMBERS_RE.findall(value)
+
+    @staticmethod
+    def tokenize_value(value: str) -> set[str]:
+        """Split given value into a set of tokens."""
+        return set(SymbolNameField.tokenize_iter(value))
+
+    @staticmethod
+    @lru_cache(maxsize=65536)
+    def tokenize_terms(value: str) -> tuple[str, ...]:
+        """Return the lowercase terms that index given value.
+
+        Unlike ``tokenize_value``, this returns a tuple that is only meant
+        to be iterated over when indexing.  Tokens that differ only in
+        case are kept, like ``TextField.index`` would keep them.
+
+        The result is cached, as the same names are often repeated across
+        many files.
+
+        """
+        tokens = dict.fromkeys(SymbolNameField.tokenize_iter(value))
+        return tuple(token.lower() for token in tokens)
 
     def index(self, document, value: Any):
         """Index ``value`` in the ``document``."""
@@ -305,10 +363,14 @@ class SymbolNameField(TextField):
         if isinstance(value, bytes):
             value = value.decode()
 
-        tokens = self.tokenize_value(value)
-        value = " ".join(tokens)
-
-        super().index(document, value)
+        # Add the terms directly, this is what ``TextField.index`` would
+        # do with the tokens joined by spaces, but without creating a
+        # TermGenerator and splitting the text again.
+        prefix = self.prefix
+        max_word_length = MAX_TERM_SIZE - len(prefix) - 1
+        for term in self.tokenize_terms(value):
+            if len(term) <= max_word_length:
+                document.add_term(prefix + term)
 
 
 @dataclass(frozen=True)
@@ -414,6 +476,9 @@ class Schema(Mapping):
             )
         return self._field_dict[key]
 
+    def __contains__(self, key):
+        return not self.fields or key in self._field_dict
+
     def __iter__(self):
         return iter(self._field_dict)
 
@@ -755,16 +820,42 @@ class SymbolIndex:
         except xapian.DatabaseModifiedError as e:
             raise SymbolIndex.ModifiedError from e
 
+    def search_values(
+        self, query: str | xapian.Query, field: str
+    ) -> Iterator[int]:
+        """Iterate over the ``field`` value of each symbol matching ``query``.
+
+        Only the value slot of ``field`` is read, without loading the
+        whole symbol like ``search`` does, so ``field`` must be an
+        ``IntegerField``.
+
+        """
+        field_data = self.schema[field]
+        if not isinstance(field_data, IntegerField):
+            msg = f"Field '{field}' is not an integer field"
+            raise ValueError(msg)
+
+        slot = field_data.slot
+        return (
+            int(xapian.sortable_unserialise(match.document.get_value(slot)))
+            for match in self.search(query).mset  # pyright: ignore
+        )
+
     def parse_query(self, query: str) -> xapian.Query:
         """Parse the given query string, returning a Query object."""
+        return self._query_parser().parse_query(query)
+
+    @staticmethod
+    @cache
+    def _query_parser() -> QueryParser:
+        # Reuse one parser, it caches the queries it has already parsed
         from bdx.query_parser import QueryParser
 
-        query_parser = QueryParser(
+        return QueryParser(
             SymbolIndex.SCHEMA,
             default_fields=["name", "demangled"],
             auto_wildcard=True,
         )
-        return query_parser.parse_query(query)
 
     def _live_db(self) -> xapian.Database | xapian.WritableDatabase:
         if self._db is None:
@@ -1045,10 +1136,20 @@ def index_binary_directory(
             index.delete_file(file)
             debug("File deleted: {}", file)
 
+    if not changed_files:
+        return stats
+
+    # Each worker opens its own shard, so don't start more of them than
+    # there are files to index.
+    pool_options = replace(
+        options,
+        num_processes=min(options.num_processes, len(changed_files)),
+    )
+
     with (
         sigint_catcher() as interrupted,
         _WorkerPool(
-            options,
+            pool_options,
             interrupted,
             index_path,
             use_compilation_database=use_compilation_database,
@@ -1,4 +1,5 @@
 import re
+import threading
 from enum import Enum
 from typing import Optional
 
@@ -27,22 +28,47 @@ class Token(Enum):
     @staticmethod
     def patterns() -> list[tuple["Token", re.Pattern]]:
         """Return a list of patterns for each token, in proper test order."""
-        return [
-            (Token.Whitespace, re.compile(r"\s+")),
-            (Token.And, re.compile(r"AND\b")),
-            (Token.Or, re.compile(r"OR\b")),
-            (Token.Not, re.compile(r"NOT\b|!")),
-            (Token.Lparen, re.compile(r"[(]")),
-            (Token.Rparen, re.compile(r"[)]")),
-            (Token.String, re.compile(r'"([^"]+)"')),
-            (Token.Field, re.compile(r"([a-zA-Z_]+):")),
-            (Token.MatchAll, re.compile(r"[*]:[*]")),
-            (Token.Wildcard, re.compile(r"[*]")),
-            (Token.Term, re.compile(r"([^\s()*]+)")),
-        ]
+        return list(_TOKEN_PATTERNS)
+
+
+_TOKEN_PATTERNS = [
+    (Token.Whitespace, re.compile(r"\s+")),
+    (Token.And, re.compile(r"AND\b")),
+    (Token.Or, re.compile(r"OR\b")),
+    (Token.Not, re.compile(r"NOT\b|!")),
+    (Token.Lparen, re.compile(r"[(]")),
+    (Token.Rparen, re.compile(r"[)]")),
+    (Token.String, re.compile(r'"([^"]+)"')),
+    (Token.Field, re.compile(r"([a-zA-Z_]+):")),
+    (Token.MatchAll, re.compile(r"[*]:[*]")),
+    (Token.Wildcard, re.compile(r"[*]")),
+    (Token.Term, re.compile(r"([^\s()*]+)")),
+]
+
+
+def _combine_token_patterns():
+    # Join the token patterns into one regex, each one in its own group.
+    # Alternatives are tried in order, so the first token pattern that
+    # matches wins, same as when trying them one by one.
+    #
+    # Also return a map of the index of each token's group to the token
+    # and the index of the group holding its value (if any).
+    groups = {}
+    alternatives = []
+    index = 1
+    for token, pattern in _TOKEN_PATTERNS:
+        groups[index] = (token, index + 1 if pattern.groups else None)
+        alternatives.append(f"({pattern.pattern})")
+        index += 1 + pattern.groups
+    return re.compile("|".join(alternatives)), groups
+
 
+_TOKEN_RE, _TOKEN_GROUPS = _combine_token_patterns()
 
 _MATCH_ALL = xapian.Query.MatchAll  # pyright: ignore
+_EMPTY = xapian.Query()
+
+_PARSE_CACHE_SIZE = 512
 
 
 class QueryParser:
@@ -97,7 +123,7 @@ class QueryParser:
                 E.g. search "term" will become "field:term*".
 
         """
-        self.schema = schema
+        self._schema = schema
         self.default_fields = default_fields or list(schema)
         self.auto_wildcard = auto_wildcard
         self._query = ""
@@ -106,17 +132,72 @@ class QueryParser:
         self._pos: int = 0
         self._parsed = None
         self._empty = xapian.Query()
+        self._cacheable = True
+        self._cache: dict[tuple, xapian.Query] = {}
+        # Parsing keeps its state in the parser, a parser shared between
+        # threads must only parse one query at a time
+        self._lock = threading.Lock()
+
+    @property
+    def schema(self) -> Schema:
+        """The database schema used by this parser."""
+        return self._schema
+
+    @schema.setter
+    def schema(self, schema: Schema):
+        if schema is self._schema:
+            return
+        self._schema = schema
+        self.cache_clear()
+
+    def cache_clear(self):
+        """Forget the results of all previously parsed queries."""
+        with self._lock:
+            self._cache.clear()
 
     def parse_query(self, query: str) -> xapian.Query:
-        """Parse the given query."""
-        if query.strip() == "*:*":
+        """Parse the given query.
+
+        Results are cached, parsing the same query again with the same
+        settings returns the same Query object.  Queries with values that
+        are resolved on the filesystem, like relative paths, are not
+        cached.
+
+        """
+        stripped = query.strip()
+        if not stripped:
+            return _EMPTY
+        if stripped == "*:*":
             return _MATCH_ALL
 
+        key = (
+            query,
+            tuple(self.default_fields),
+            self.auto_wildcard,
+            self.ignore_missing_field_values,
+        )
+        with self._lock:
+            parsed = self._cache.pop(key, None)
+            if parsed is None:
+                parsed = self._parse_query_str(query)
+                if not self._cacheable:
+                    return parsed
+                if len(self._cache) >= _PARSE_CACHE_SIZE:
+                    # Evict the least recently used query
+                    del self._cache[next(iter(self._cache))]
+
+            # Dicts keep insertion order, (re-)inserting the query marks it
+            # as the most recently used one
+            self._cache[key] = parsed
+            return parsed
+
+    def _parse_query_str(self, query: str) -> xapian.Query:
         self._query = query
         self._token = None
         self._pos = 0
         self._parsed = None
         self._empty = xapian.Query()  # re-set it for tests
+        self._cacheable = True
 
         self._next_token()
         try:
@@ -124,38 +205,31 @@ class QueryParser:
         except Exception as e:
             raise QueryParser.Error(str(e)) from e
         self._expect(Token.EOF, "EOF")
-        if self._parsed is None:
-            return xapian.Query()
+        if self._parsed is None or self._parsed is self._empty:
+            return _EMPTY
         return self._parsed
 
     def _next_token(self):
+        query = self._query
         while True:
-            pos = self._pos
-            query = self._query[pos:]
-            if not query:
-                self._token = Token.EOF
-                return
-
-            for token, pat in Token.patterns():
-                match = re.match(pat, query)
-                if match:
-                    _, idx = match.span()
-                    pos += idx
-                    self._pos = pos
-
-                    if token == Token.Whitespace:
-                        self._next_token()
-                        return
-
-                    self._token = token
-                    if match.groups():
-                        self._value = match.group(1)
-                    else:
-                        self._value = ""
+            match = _TOKEN_RE.match(query, self._pos)
+            if not match:
+                if self._pos >= len(query):
+                    self._token = Token.EOF
                     return
 
-            debug(f"Warning: unknown token at {self._pos}")
-            self._pos += 1
+                debug(f"Warning: unknown token at {self._pos}")
+                self._pos += 1
+                continue
+
+            self._pos = match.end()
+            token, value_group = _TOKEN_GROUPS[match.lastindex]
+            if token == Token.Whitespace:
+                continue
+
+            self._token = token
+            self._value = match.group(value_group) if value_group else ""
+            return
 
     def _parse_query(self):
         return self._parse_boolexpr()
@@ -164,52 +238,47 @@ class QueryParser:
         return self._parse_orexpr()
 
     def _parse_orexpr(self):
+        # Parse the whole "andexpr OR andexpr OR ..." chain in a loop
+        # instead of recursing for each operand.
         if not self._parse_andexpr():
             return False
-        if self._token == Token.Or:
+        operands = [self._parsed]
+
+        while self._token == Token.Or:
             self._next_token()
-            lhs = self._parsed
-            if not self._parse_orexpr():
+            if not self._parse_andexpr():
                 msg = "Expected RHS operand to OR"
                 raise QueryParser.Error(msg)
-            rhs = self._parsed
-            if lhs != self._empty and rhs != self._empty:
-                self._parsed = xapian.Query(xapian.Query.OP_OR, lhs, rhs)
-            elif lhs != self._empty:
-                self._parsed = lhs
-            elif rhs != self._empty:
-                self._parsed = rhs
-
-        self._parsed = self._flatten_query(xapian.Query.OP_OR, self._parsed)
+            operands.append(self._parsed)
 
+        operands = [query for query in operands if query != self._empty]
+        if operands:
+            self._parsed = self._make_flat_query(xapian.Query.OP_OR, operands)
+        else:
+            self._parsed = self._empty
         return True
 
     def _parse_andexpr(self):
+        # Same as _parse_orexpr, for "expr [AND] expr [AND] ..." chains
         if not self._parse_expr():
             return False
+        operands = [self._parsed]
 
-        lhs = self._parsed
-        rhs = None
-
-        if self._token == Token.And:
-            self._next_token()
-            if not self._parse_andexpr():
-                msg = "Expected RHS operand to AND"
-                raise QueryParser.Error(msg)
-            rhs = self._parsed
-        elif self._parse_andexpr():
-            rhs = self._parsed
-
-        if rhs is not None:
-            if lhs is None:
-                self._parsed = rhs
-            else:
-                self._parsed = xapian.Query(xapian.Query.OP_AND, lhs, rhs)
+        while True:
+            if self._token == Token.And:
+                self._next_token()
+                if not self._parse_expr():
+                    msg = "Expected RHS operand to AND"
+                    raise QueryParser.Error(msg)
+            elif not self._parse_expr():
+                break
+            operands.append(self._parsed)
+
+        operands = [query for query in operands if query is not None]
+        if operands:
+            self._parsed = self._make_flat_query(xapian.Query.OP_AND, operands)
         else:
-            self._parsed = lhs
-
-        self._parsed = self._flatten_query(xapian.Query.OP_AND, self._parsed)
-
+            self._parsed = None
         return True
 
     def _parse_expr(self):
@@ -232,9 +301,11 @@ class QueryParser:
             self._next_token()
             self._parsed = None
             self._parse_query()
-            self._expect(
-                Token.Rparen, f'closing ")" (opening at position {pos - 1})'
-            )
+            if self._token != Token.Rparen:
+                self._expect(
+                    Token.Rparen,
+                    f'closing ")" (opening at position {pos - 1})',
+                )
             self._next_token()
         elif self._token == Token.Term:
             retval = self._parse_term()
@@ -244,7 +315,8 @@ class QueryParser:
             field = self._value
             self._parse_field()
 
-            if field not in self.schema:
+            schema_field = self.schema.get(field)
+            if schema_field is None:
                 known = ", ".join(self.schema.keys())
                 msg = f'Unknown field "{field}", must be one of [{known}]'
                 raise QueryParser.Error(msg)
@@ -265,7 +337,7 @@ class QueryParser:
                 self._parsed = self._empty
                 retval = True
             else:
-                retval = self._parse_field_with_value(field)
+                retval = self._parse_field_with_value(field, schema_field)
         else:
             retval = False
         return retval
@@ -273,32 +345,35 @@ class QueryParser:
     def _parse_term(self):
         value, wildcard = self._maybe_consume_wildcard(Token.Term, "term")
 
-        subqueries = []
-        for field in self.default_fields:
-            subquery = self.schema[field].make_query(
-                value, wildcard=wildcard or self.auto_wildcard
-            )
-            subqueries.append(subquery)
-
-        self._parsed = self._merge_queries(subqueries)
+        self._parsed = self._make_default_fields_query(
+            value, wildcard or self.auto_wildcard
+        )
         return True
 
     def _parse_string(self):
         value, wildcard = self._maybe_consume_wildcard(Token.String, "string")
 
-        subqueries = []
-        for field in self.default_fields:
-            subquery = self.schema[field].make_query(value, wildcard=wildcard)
-            subqueries.append(subquery)
-
-        self._parsed = self._merge_queries(subqueries)
+        self._parsed = self._make_default_fields_query(value, wildcard)
         return True
 
+    def _make_default_fields_query(self, value, wildcard):
+        schema = self.schema
+        subqueries = [
+            self._make_field_query(schema[field], value, wildcard)
+            for field in self.default_fields
+        ]
+        return self._merge_queries(subqueries)
+
+    def _make_field_query(self, schema_field, value, wildcard):
+        if schema_field.query_uses_filesystem(value):
+            self._cacheable = False
+        return schema_field.make_query(value, wildcard=wildcard)
+
     def _parse_field(self):
         self._expect(Token.Field, "field name")
         self._next_token()
 
-    def _parse_field_with_value(self, field):
+    def _parse_field_with_value(self, field, schema_field):
         if self._token == Token.Wildcard:
             # We are looking at "field:*"
             value, wildcard = "", True
@@ -309,12 +384,7 @@ class QueryParser:
                 f'value for field "{field}"',
             )
 
-        schema_field = self.schema[field]
-
-        self._parsed = schema_field.make_query(
-            value,
-            wildcard=wildcard,
-        )
+        self._parsed = self._make_field_query(schema_field, value, wildcard)
 
         return True
 
@@ -340,6 +410,17 @@ class QueryParser:
         else:
             return xapian.Query(xapian.Query.OP_OR, subqueries)
 
+    def _make_flat_query(self, op, queries: list[xapian.Query]):
+        # Make a single ``op`` query of all the queries, subqueries of the
+        # same type are merged into it
+        if len(queries) == 1:
+            return self._flatten_query(op, queries[0])
+
+        subqueries = []
+        for query in queries:
+            subqueries.extend(self._get_all_subqueries_of_type(op, query))
+        return xapian.Query(op, subqueries)
+
     def _flatten_query(self, op, query: Optional[xapian.Query]):
         if query is not None and query.get_type() == op:
             subqueries = self._get_all_subqueries_of_type(op, query)
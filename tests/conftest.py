@@ -1,7 +1,8 @@
 import os
-from contextlib import contextmanager
+from contextlib import ExitStack
+from dataclasses import astuple
 from pathlib import Path
-from uuid import uuid4
+from types import SimpleNamespace
 
 import pytest
 
@@ -18,32 +19,68 @@ from bdx.index import (
 FIXTURE_PATH = Path(__file__).parent / "fixture"
 
 
-@pytest.fixture
-def chdir():
-    @contextmanager
-    def changer(dir):
-        old = os.getcwd()
-        try:
-            os.chdir(dir)
-            yield
-        finally:
-            os.chdir(old)
+@pytest.fixture(scope="session")
+def build_fixture_index(tmp_path_factory):
+    """Return a function that indexes the fixture directory.
+
+    Each distinct combination of arguments is indexed only once per
+    session, and the path of that index is returned on subsequent calls.
+    The returned indexes must not be modified.
+
+    """
+    built: dict[tuple, Path] = {}
 
-    yield changer
+    def build(
+        options: IndexingOptions, use_compilation_database: bool = False
+    ) -> Path:
+        key = (astuple(options), use_compilation_database)
+        if key not in built:
+            index_path = tmp_path_factory.mktemp("index")
+            index_binary_directory(
+                FIXTURE_PATH,
+                index_path,
+                options,
+                use_compilation_database=use_compilation_database,
+            )
+            built[key] = index_path
+        return built[key]
+
+    return build
 
 
 @pytest.fixture(scope="session")
-def readonly_index(tmp_path_factory):
-    index_path = tmp_path_factory.mktemp(f"index{uuid4()}")
-    index_binary_directory(
-        FIXTURE_PATH,
-        index_path,
-        IndexingOptions(
-            index_relocations=True,
-        ),
-    )
-    with SymbolIndex.open(index_path, readonly=True) as index:
-        yield index
+def open_fixture_index(build_fixture_index):
+    """Return a function that opens an index of the fixture directory.
+
+    Takes the same arguments as ``build_fixture_index``.  Each index is
+    opened read-only once per session and closed at the end of it.
+
+    """
+    opened: dict[Path, SymbolIndex] = {}
+
+    with ExitStack() as stack:
+
+        def open_index(
+            options: IndexingOptions, use_compilation_database: bool = False
+        ) -> SymbolIndex:
+            index_path = build_fixture_index(options, use_compilation_database)
+            if index_path not in opened:
+                opened[index_path] = stack.enter_context(
+                    SymbolIndex.open(index_path, readonly=True)
+                )
+            return opened[index_path]
+
+        yield open_index
+
+
+@pytest.fixture(scope="session")
+def readonly_index(open_fixture_index):
+    return open_fixture_index(IndexingOptions(index_relocations=True))
+
+
+@pytest.fixture(scope="session")
+def all_symbols(readonly_index):
+    return frozenset(readonly_index.search("*:*"))
 
 
 @pytest.fixture(scope="session")
@@ -51,7 +88,20 @@ def fixture_path():
     return FIXTURE_PATH
 
 
-@pytest.fixture(autouse=True)
+@pytest.fixture(scope="session")
+def paths(fixture_path):
+    """Return the paths of the files in the fixture directory."""
+    subdir = fixture_path / "subdir"
+    return SimpleNamespace(
+        subdir=subdir,
+        foo=subdir / "foo.c.o",
+        bar=subdir / "bar.cpp.o",
+        toplev_src=fixture_path / "toplev.c",
+        foo_src=subdir / "foo.c",
+    )
+
+
+@pytest.fixture(scope="session", autouse=True)
 def run_around_tests():
     # Simplify debugging by indexing in this process only for tests
     os.environ["_BDX_NO_MULTIPROCESSING"] = "1"
@@ -4,7 +4,7 @@ from pathlib import Path
 from random import shuffle
 from typing import Optional
 
-from bdx.binary import BinaryDirectory, NameDemangler
+from bdx.binary import BinaryDirectory, NameDemangler, _demangle
 
 
 def create_fake_elf_file(path: Path, mtime: Optional[datetime] = None):
@@ -55,6 +55,16 @@ def test_name_demangler():
     assert nd.demangle("memset") is None
 
 
+def test_demangle_is_cached():
+    _demangle.cache_clear()
+    for _ in range(3):
+        assert (
+            _demangle("_Z12cxx_functionSt6vectorIiSaIiEE")
+            == "cxx_function(std::vector<int, std::allocator<int> >)"
+        )
+    assert _demangle.cache_info().hits == 2
+
+
 def test_find_files(tmp_path):
     create_fake_elf_file(tmp_path / "0.o")
     create_fake_elf_file(tmp_path / "1.o")
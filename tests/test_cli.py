@@ -63,36 +63,36 @@ def test_cli_indexing(fixture_path, index_path):
     assert "bar.cpp.o: .bss: bar" in lines
 
 
-def test_cli_indexing_with_compile_commands(fixture_path, index_path, chdir):
-    with chdir(fixture_path):
-        if not Path("compile_commands.json").exists():
-            pytest.skip(
-                reason=(
-                    "compile_commands.json not generated, do: "
-                    f"`make -C {fixture_path} compile_commands.json`"
-                )
+def test_cli_indexing_with_compile_commands(
+    fixture_path, index_path, monkeypatch
+):
+    monkeypatch.chdir(fixture_path)
+    if not Path("compile_commands.json").exists():
+        pytest.skip(
+            reason=(
+                "compile_commands.json not generated, do: "
+                f"`make -C {fixture_path} compile_commands.json`"
             )
+        )
 
-        runner = CliRunner()
+    runner = CliRunner()
 
-        result = index_directory_compile_commands(runner, index_path)
-        assert result.exit_code == 0
+    result = index_directory_compile_commands(runner, index_path)
+    assert result.exit_code == 0
 
-        searchresult = search_directory(
-            runner,
-            index_path,
-            "-f",
-            "{basename}: {section}: {name}: {source}",
-            "*:*",
-        )
-        assert searchresult.exit_code == 0
+    searchresult = search_directory(
+        runner,
+        index_path,
+        "-f",
+        "{basename}: {section}: {name}: {source}",
+        "*:*",
+    )
+    assert searchresult.exit_code == 0
 
-        lines = searchresult.output.splitlines()
+    lines = searchresult.output.splitlines()
 
-        assert (
-            f"foo.c.o: .text: c_function: {fixture_path}/subdir/foo.c" in lines
-        )
-        assert f"bar.cpp.o: .bss: bar: {fixture_path}/subdir/bar.cpp" in lines
+    assert f"foo.c.o: .text: c_function: {fixture_path}/subdir/foo.c" in lines
+    assert f"bar.cpp.o: .bss: bar: {fixture_path}/subdir/bar.cpp" in lines
 
 
 def test_cli_search_json_output(fixture_path, index_path):
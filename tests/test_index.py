@@ -1,6 +1,7 @@
+import os
 import shutil
+from operator import attrgetter
 from pathlib import Path
-from shutil import rmtree
 
 import pytest
 
@@ -8,216 +9,191 @@ import pytest
 from bdx.binary import SymbolType
 from bdx.index import (
     IndexingOptions,
-    SymbolIndex,
     SymbolNameField,
-    index_binary_directory,
 )
 from bdx.query_parser import QueryParser
 
 # isort: on
 
 
-def test_indexing(fixture_path, tmp_path):
-    index_path = tmp_path / "index"
-    index_binary_directory(
-        fixture_path, index_path, IndexingOptions(index_relocations=True)
-    )
-
-    with SymbolIndex.open(index_path, readonly=True) as index:
-        symbols = index.search("*:*")
-        assert symbols.count == 18
-        by_name = {x.name: x for x in symbols}
-
-        top_level_symbol = by_name["top_level_symbol"]
-        other_top_level_symbol = by_name["other_top_level_symbol"]
-        bar = by_name["bar"]
-        cxx_function = by_name["_Z12cxx_functionSt6vectorIiSaIiEE"]
-        foo = by_name["foo"]
-        c_function = by_name["c_function"]
-        camel_case_symbol = by_name["CamelCaseSymbol"]
-        cpp_camel_case_symbol = by_name["_Z18CppCamelCaseSymbolPKc"]
-        main = by_name["main"]
-        uses_c_function = by_name["uses_c_function"]
-        foo_ = by_name["foo_"]
-        foo__ = by_name["foo__"]
-        uses_foo = by_name["uses_foo"]
-
-        assert top_level_symbol.path == fixture_path / "toplev.c.o"
-        assert top_level_symbol.name == "top_level_symbol"
-        assert top_level_symbol.demangled is None
-        assert top_level_symbol.section == ".rodata"
-        assert top_level_symbol.address == 0
-        assert top_level_symbol.size == 64
-        assert top_level_symbol.type == SymbolType.OBJECT
-        assert top_level_symbol.relocations == []
-        assert top_level_symbol.mtime > 0
-
-        assert other_top_level_symbol.path == fixture_path / "toplev.c.o"
-        assert other_top_level_symbol.name == "other_top_level_symbol"
-        assert other_top_level_symbol.demangled is None
-        assert other_top_level_symbol.section == ".data.rel.ro.local"
-        assert other_top_level_symbol.address == 0
-        assert other_top_level_symbol.size == 8
-        assert other_top_level_symbol.type == SymbolType.OBJECT
-        assert other_top_level_symbol.relocations == ["top_level_symbol"]
-        assert other_top_level_symbol.mtime > 0
-
-        assert bar.path == fixture_path / "subdir" / "bar.cpp.o"
-        assert bar.name == "bar"
-        assert bar.section == ".bss"
-        assert bar.type == SymbolType.OBJECT
-        assert bar.relocations == []
-
-        assert cxx_function.path == fixture_path / "subdir" / "bar.cpp.o"
-        assert cxx_function.name == "_Z12cxx_functionSt6vectorIiSaIiEE"
-        assert (
-            cxx_function.demangled
-            == "cxx_function(std::vector<int, std::allocator<int> >)"
-        )
-        assert cxx_function.section == ".text"
-        assert cxx_function.type == SymbolType.FUNC
-        assert cxx_function.relocations == [
-            "bar",
-            "foo",
-        ]
-
-        assert foo.path == fixture_path / "subdir" / "foo.c.o"
-        assert foo.name == "foo"
-        assert foo.section == ".bss"
-        assert foo.type == SymbolType.OBJECT
-        assert foo.relocations == []
-
-        assert c_function.path == fixture_path / "subdir" / "foo.c.o"
-        assert c_function.name == "c_function"
-        assert c_function.section == ".text"
-        assert c_function.type == SymbolType.FUNC
-        assert c_function.relocations == [
-            "foo",
-        ]
-
-        for i in range(5):
-            symbol = by_name[f"a_name{i}"]
-            assert symbol.path == fixture_path / "subdir" / "foo.c.o"
-            assert symbol.name == f"a_name{i}"
-            assert symbol.section == ".bss"
-            assert symbol.type == SymbolType.OBJECT
-            assert symbol.relocations == []
-
-        assert camel_case_symbol.path == fixture_path / "subdir" / "foo.c.o"
-        assert camel_case_symbol.name == "CamelCaseSymbol"
-        assert camel_case_symbol.section == ".text"
-        assert camel_case_symbol.type == SymbolType.FUNC
-        assert camel_case_symbol.relocations == []
-
-        assert (
-            cpp_camel_case_symbol.path == fixture_path / "subdir" / "bar.cpp.o"
-        )
-        assert cpp_camel_case_symbol.name == "_Z18CppCamelCaseSymbolPKc"
-        assert cpp_camel_case_symbol.section == ".text"
-        assert cpp_camel_case_symbol.type == SymbolType.FUNC
-        assert cpp_camel_case_symbol.relocations == []
-
-        assert main.path == fixture_path / "toplev.c.o"
-        assert main.name == "main"
-        assert main.section == ".text"
-        assert main.type == SymbolType.FUNC
-        assert main.relocations == ["uses_c_function"]
-
-        assert uses_c_function.path == fixture_path / "subdir" / "bar.cpp.o"
-        assert uses_c_function.name == "uses_c_function"
-        assert uses_c_function.section == ".text"
-        assert uses_c_function.type == SymbolType.FUNC
-        assert uses_c_function.relocations == ["c_function"]
-
-        assert foo_.path == fixture_path / "subdir" / "foo.c.o"
-        assert foo_.section == ".bss"
-        assert foo_.type == SymbolType.OBJECT
-        assert foo_.size == 8
-
-        assert foo__.path == fixture_path / "subdir" / "foo.c.o"
-        assert foo__.section == ".bss"
-        assert foo__.type == SymbolType.OBJECT
-        assert foo__.size == 4
-
-        assert uses_foo.path == fixture_path / "subdir" / "foo.c.o"
-        assert uses_foo.section == ".text"
-        assert uses_foo.type == SymbolType.FUNC
-        assert uses_foo.size == 13
-
-
-def test_indexing_min_symbol_size(fixture_path, tmp_path):
-    index_path = tmp_path / "index"
-    for msize in [0, 1, 64, 65]:
-        try:
-            rmtree(index_path)
-        except FileNotFoundError:
-            pass
-
-        index_binary_directory(
-            fixture_path, index_path, IndexingOptions(min_symbol_size=msize)
+EXPECTED_SYMBOLS = {
+    "top_level_symbol": {
+        "path": "toplev.c.o",
+        "demangled": None,
+        "section": ".rodata",
+        "address": 0,
+        "size": 64,
+        "type": SymbolType.OBJECT,
+        "relocations": [],
+    },
+    "other_top_level_symbol": {
+        "path": "toplev.c.o",
+        "demangled": None,
+        "section": ".data.rel.ro.local",
+        "address": 0,
+        "size": 8,
+        "type": SymbolType.OBJECT,
+        "relocations": ["top_level_symbol"],
+    },
+    "bar": {
+        "path": "subdir/bar.cpp.o",
+        "section": ".bss",
+        "type": SymbolType.OBJECT,
+        "relocations": [],
+    },
+    "_Z12cxx_functionSt6vectorIiSaIiEE": {
+        "path": "subdir/bar.cpp.o",
+        "demangled": "cxx_function(std::vector<int, std::allocator<int> >)",
+        "section": ".text",
+        "type": SymbolType.FUNC,
+        "relocations": ["bar", "foo"],
+    },
+    "foo": {
+        "path": "subdir/foo.c.o",
+        "section": ".bss",
+        "type": SymbolType.OBJECT,
+        "relocations": [],
+    },
+    "c_function": {
+        "path": "subdir/foo.c.o",
+        "section": ".text",
+        "type": SymbolType.FUNC,
+        "relocations": ["foo"],
+    },
+    **{
+        f"a_name{i}": {
+            "path": "subdir/foo.c.o",
+            "section": ".bss",
+            "type": SymbolType.OBJECT,
+            "relocations": [],
+        }
+        for i in range(5)
+    },
+    "CamelCaseSymbol": {
+        "path": "subdir/foo.c.o",
+        "section": ".text",
+        "type": SymbolType.FUNC,
+        "relocations": [],
+    },
+    "_Z18CppCamelCaseSymbolPKc": {
+        "path": "subdir/bar.cpp.o",
+        "section": ".text",
+        "type": SymbolType.FUNC,
+        "relocations": [],
+    },
+    "main": {
+        "path": "toplev.c.o",
+        "section": ".text",
+        "type": SymbolType.FUNC,
+        "relocations": ["uses_c_function"],
+    },
+    "uses_c_function": {
+        "path": "subdir/bar.cpp.o",
+        "section": ".text",
+        "type": SymbolType.FUNC,
+        "relocations": ["c_function"],
+    },
+    "foo_": {
+        "path": "subdir/foo.c.o",
+        "section": ".bss",
+        "type": SymbolType.OBJECT,
+        "size": 8,
+    },
+    "foo__": {
+        "path": "subdir/foo.c.o",
+        "section": ".bss",
+        "type": SymbolType.OBJECT,
+        "size": 4,
+    },
+    "uses_foo": {
+        "path": "subdir/foo.c.o",
+        "section": ".text",
+        "type": SymbolType.FUNC,
+        "size": 13,
+    },
+}
+
+
+def test_indexing(fixture_path, open_fixture_index):
+    index = open_fixture_index(IndexingOptions(index_relocations=True))
+    symbols = list(index.search("*:*"))
+    assert len(symbols) == 18
+    by_name = dict(zip(map(attrgetter("name"), symbols), symbols))
+
+    expected = {
+        name: {**attrs, "path": fixture_path / attrs["path"]}
+        for name, attrs in EXPECTED_SYMBOLS.items()
+    }
+    actual = {
+        name: {key: getattr(by_name[name], key) for key in attrs}
+        for name, attrs in expected.items()
+    }
+    assert actual == expected
+
+    assert all(sym.mtime > 0 for sym in symbols)
+
+
+@pytest.mark.parametrize("msize", [0, 1, 64, 65])
+def test_indexing_min_symbol_size(open_fixture_index, msize):
+    # Only the symbol size filter matters here, skip the source file
+    # lookup (a dwarfdump process per file) and demangling.
+    index = open_fixture_index(
+        IndexingOptions(
+            min_symbol_size=msize,
+            demangle_names=False,
+            use_dwarfdump=False,
         )
+    )
+    symbols = set(index.search("*:*"))
+    by_name = dict(zip(map(attrgetter("name"), symbols), symbols))
+    assert symbols
 
-        with SymbolIndex.open(index_path, readonly=True) as index:
-            symbols = set(index.search("*:*"))
-            by_name = {x.name: x for x in symbols}
-            assert symbols
-
-            for sym in symbols:
-                # One entry (with an empty name) per file is when
-                # no regular symbols were added
-                if sym.name:
-                    assert sym.size >= msize
-
-            if msize <= 64:
-                assert "top_level_symbol" in by_name
-            else:
-                assert "top_level_symbol" not in by_name
+    for sym in symbols:
+        # One entry (with an empty name) per file is when
+        # no regular symbols were added
+        if sym.name:
+            assert sym.size >= msize
 
+    if msize <= 64:
+        assert "top_level_symbol" in by_name
+    else:
+        assert "top_level_symbol" not in by_name
 
-def test_indexing_without_relocations(fixture_path, tmp_path):
-    index_path = tmp_path / "index"
-    index_binary_directory(
-        fixture_path, index_path, IndexingOptions(index_relocations=False)
-    )
 
-    with SymbolIndex.open(index_path, readonly=True) as index:
-        symbols = list(index.search("*:*"))
-        assert symbols
+def test_indexing_without_relocations(open_fixture_index, readonly_index):
+    index = open_fixture_index(IndexingOptions(index_relocations=False))
+    assert index.search("*:*").count
 
-        for symbol in symbols:
-            assert not symbol.relocations
+    # Relocations are indexed as terms, check them directly instead of
+    # unpickling every symbol
+    assert next(readonly_index.iter_prefix("relocations", ""), None)
+    assert next(index.iter_prefix("relocations", ""), None) is None
 
 
-def test_indexing_adds_source_field_with_dwarfdump(fixture_path, tmp_path):
+def test_indexing_adds_source_field_with_dwarfdump(open_fixture_index):
     """Check that ``source`` is set when using dwarfdump program."""
     if not shutil.which("dwarfdump"):
         pytest.skip(reason=("dwarfdump program not available"))
 
-    index_path = tmp_path / "index"
-    index_binary_directory(
-        fixture_path, index_path, IndexingOptions(use_dwarfdump=True)
-    )
+    index = open_fixture_index(IndexingOptions(use_dwarfdump=True))
+    # Debug info maps the build directory to /src, see fixture/Makefile
+    source_dir = Path("/src") / "tests" / "fixture"
 
-    with SymbolIndex.open(index_path, readonly=True) as index:
-        symbols = list(index.search("path:toplev.c.o"))
-        assert symbols
-        for symbol in symbols:
-            assert (
-                symbol.source
-                == Path("/src") / "tests" / "fixture" / "toplev.c"
-            )
+    symbols = list(index.search("path:toplev.c.o"))
+    assert symbols
+    toplev_src = source_dir / "toplev.c"
+    for symbol in symbols:
+        assert symbol.source == toplev_src
 
-        symbols = list(index.search("path:foo.c.o"))
-        assert symbols
-        for symbol in symbols:
-            assert (
-                symbol.source
-                == Path("/src") / "tests" / "fixture" / "subdir" / "foo.c"
-            )
+    symbols = list(index.search("path:foo.c.o"))
+    assert symbols
+    foo_src = source_dir / "subdir" / "foo.c"
+    for symbol in symbols:
+        assert symbol.source == foo_src
 
 
 def test_indexing_adds_source_field_with_compilation_database(
-    fixture_path, tmp_path
+    fixture_path, paths, open_fixture_index
 ):
     """Check that ``source`` is set when using compile_commands.json."""
     if not (fixture_path / "compile_commands.json").exists():
@@ -228,24 +204,19 @@ def test_indexing_adds_source_field_with_compilation_database(
             )
         )
 
-    index_path = tmp_path / "index"
-    index_binary_directory(
-        fixture_path,
-        index_path,
+    index = open_fixture_index(
         IndexingOptions(use_dwarfdump=False),
         use_compilation_database=True,
     )
+    symbols = list(index.search("path:toplev.c.o"))
+    assert symbols
+    for symbol in symbols:
+        assert symbol.source == paths.toplev_src
 
-    with SymbolIndex.open(index_path, readonly=True) as index:
-        symbols = list(index.search("path:toplev.c.o"))
-        assert symbols
-        for symbol in symbols:
-            assert symbol.source == fixture_path / "toplev.c"
-
-        symbols = list(index.search("path:foo.c.o"))
-        assert symbols
-        for symbol in symbols:
-            assert symbol.source == fixture_path / "subdir" / "foo.c"
+    symbols = list(index.search("path:foo.c.o"))
+    assert symbols
+    for symbol in symbols:
+        assert symbol.source == paths.foo_src
 
 
 def test_searching_by_wildcard(readonly_index):
@@ -264,19 +235,18 @@ def test_searching_by_wildcard(readonly_index):
     assert set(readonly_index.search("a_")) == symbols
 
 
-def test_searching_by_exact_name(fixture_path, readonly_index):
+def test_searching_by_exact_name(paths, readonly_index):
     all_symbols = list(readonly_index.search("name:foo"))
-
     symbols = list(readonly_index.search("fullname:foo"))
     assert len(symbols) == 1
 
     symbol = symbols[0]
 
     assert symbol.name == "foo"
-    assert symbol.path == fixture_path / "subdir" / "foo.c.o"
+    assert symbol.path == paths.foo
 
-    not_matching_exactly = list(
-        sorted(set(all_symbols).difference(set(symbols)), key=lambda s: s.name)
+    not_matching_exactly = sorted(
+        frozenset(all_symbols) - frozenset(symbols), key=attrgetter("name")
     )
     assert len(not_matching_exactly) == 3
 
@@ -288,80 +258,87 @@ def test_searching_by_exact_name(fixture_path, readonly_index):
 def test_searching_camel_case(readonly_index):
     symbols = set(readonly_index.search("camel"))
     assert symbols
-    by_name = {x.name: x for x in symbols}
+    by_name = dict(zip(map(attrgetter("name"), symbols), symbols))
+
+    c_queries = [
+        "case",
+        "cam ca sym",
+        "cam ca",
+        "cas sym",
+        "symbol",
+        "camelc*",
+        "Camel",
+        "CamelC*",
+        "CamelCase",
+        "camelcaseS*",
+    ]
+    cxx_queries = [
+        "case",
+        "cam ca sym",
+        "cam ca",
+        "cas sym",
+        "symbol",
+        "cppcamelc*",
+        "Camel",
+    ]
+
+    # Many queries are shared, search only once for each of them
+    results = {
+        query: set(readonly_index.search(query))
+        for query in {*c_queries, *cxx_queries}
+    }
 
     assert "CamelCaseSymbol" in by_name
     ccs = by_name["CamelCaseSymbol"]
-    assert ccs in readonly_index.search("case")
-    assert ccs in readonly_index.search("cam ca sym")
-    assert ccs in readonly_index.search("cam ca")
-    assert ccs in readonly_index.search("cas sym")
-    assert ccs in readonly_index.search("symbol")
-    assert ccs in readonly_index.search("camelc*")
-    assert ccs in readonly_index.search("Camel")
-    assert ccs in readonly_index.search("CamelC*")
-    assert ccs in readonly_index.search("CamelCase")
-    assert ccs in readonly_index.search("camelcaseS*")
+    for query in c_queries:
+        assert ccs in results[query], query
 
     assert "_Z18CppCamelCaseSymbolPKc" in by_name
     ccs = by_name["_Z18CppCamelCaseSymbolPKc"]
-    assert ccs in readonly_index.search("case")
-    assert ccs in readonly_index.search("cam ca sym")
-    assert ccs in readonly_index.search("cam ca")
-    assert ccs in readonly_index.search("cas sym")
-    assert ccs in readonly_index.search("symbol")
-    assert ccs in readonly_index.search("cppcamelc*")
-    assert ccs in readonly_index.search("Camel")
+    for query in cxx_queries:
+        assert ccs in results[query], query
 
 
 def test_searching_by_address(readonly_index):
-    symbols = readonly_index.search("address:0x10")
-    assert symbols.count > 0
-    for sym in symbols:
-        assert sym.address == 16
-    names = [x.name for x in symbols]
-    assert "foo__" in names
+    addresses = list(readonly_index.search_values("address:0x10", "address"))
+    assert addresses
+    assert all(address == 16 for address in addresses)
+    assert readonly_index.search("address:0x10 fullname:foo__").count
 
 
 def test_searching_by_size(readonly_index):
-    symbols = readonly_index.search("size:8")
-    for sym in symbols:
-        assert sym.size == 8
-    names = [x.name for x in symbols]
-    assert "other_top_level_symbol" in names
-
-    symbols = readonly_index.search("size:32..128")
-    for sym in symbols:
-        assert 32 <= sym.size <= 128
-
-    names = [x.name for x in symbols]
-    assert "top_level_symbol" in names
+    sizes = list(readonly_index.search_values("size:8", "size"))
+    assert all(size == 8 for size in sizes)
+    assert readonly_index.search(
+        "size:8 fullname:other_top_level_symbol"
+    ).count
 
-    symbols = readonly_index.search("size:0x20..0x80")
-    for sym in symbols:
-        assert 32 <= sym.size <= 128
+    for query in ["size:32..128", "size:0x20..0x80"]:
+        sizes = list(readonly_index.search_values(query, "size"))
+        assert all(32 <= size <= 128 for size in sizes)
+        assert readonly_index.search(
+            f"{query} fullname:top_level_symbol"
+        ).count
 
-    names = [x.name for x in symbols]
-    assert "top_level_symbol" in names
+    with pytest.raises(ValueError, match="'name' is not an integer field"):
+        readonly_index.search_values("size:8", "name")
 
 
 def test_searching_by_type(readonly_index):
-    symbols = readonly_index.search("type:FUNC")
-    assert symbols.count > 0
+    symbols = list(readonly_index.search("type:FUNC"))
+    assert symbols
     for sym in symbols:
         assert sym.type == SymbolType.FUNC
-    names = [x.name for x in symbols]
-    assert "main" in names
+    assert any(sym.name == "main" for sym in symbols)
 
-    symbols = readonly_index.search("type:OBJECT")
-    assert symbols.count > 0
+    symbols = list(readonly_index.search("type:OBJECT"))
+    assert symbols
     for sym in symbols:
         assert sym.type == SymbolType.OBJECT
-    names = [x.name for x in symbols]
-    assert "bar" in names
+    assert any(sym.name == "bar" for sym in symbols)
 
-    symbols = readonly_index.search("type:F*")
-    assert symbols.count > 0
+    symbols = list(readonly_index.search("type:F*"))
+    assert symbols
     for sym in symbols:
         assert sym.type in [SymbolType.FUNC, SymbolType.FILE]
 
@@ -371,49 +348,51 @@ def test_searching_by_type(readonly_index):
         readonly_index.search("type:INVALIDTYPE")
 
 
-def test_searching_by_relative_path(fixture_path, readonly_index, chdir):
-    with chdir(fixture_path):
-        all_symbols = set(readonly_index.search("*:*"))
-
-        # Ensure the path is normalized
-        subdir_symbols = set(readonly_index.search("path:subdir///*"))
-        assert subdir_symbols
-        for sym in subdir_symbols:
-            assert fixture_path / "subdir" in sym.path.parents
-        for sym in all_symbols.difference(subdir_symbols):
-            assert fixture_path / "subdir" not in sym.path.parents
-
-    with chdir(fixture_path / "subdir"):
-        subdir_symbols = set(readonly_index.search("path:./*"))
-        assert subdir_symbols
-        for sym in subdir_symbols:
-            assert fixture_path / "subdir" in sym.path.parents
-        for sym in all_symbols.difference(subdir_symbols):
-            assert fixture_path / "subdir" not in sym.path.parents
-
-
-def test_searching_by_absolute_path(fixture_path, readonly_index, chdir):
-    with chdir(fixture_path):
-        all_symbols = set(readonly_index.search("*:*"))
-        # Ensure the path is normalized
-        foo_symbols = set(
-            readonly_index.search(f"path:///{fixture_path}///subdir//foo.c.o")
-        )
-        assert foo_symbols
-        for sym in foo_symbols:
-            assert sym.path == fixture_path / "subdir" / "foo.c.o"
-        for sym in all_symbols.difference(foo_symbols):
-            assert sym.path != fixture_path / "subdir" / "foo.c.o"
+def test_searching_by_relative_path(
+    fixture_path, paths, readonly_index, all_symbols, monkeypatch
+):
+    subdir_prefix = f"{paths.subdir}{os.sep}"
+    monkeypatch.chdir(fixture_path)
+
+    # Ensure the path is normalized
+    subdir_symbols = set(readonly_index.search("path:subdir///*"))
+    assert subdir_symbols
+    for sym in subdir_symbols:
+        assert str(sym.path).startswith(subdir_prefix)
+    for sym in all_symbols - subdir_symbols:
+        assert not str(sym.path).startswith(subdir_prefix)
+
+    monkeypatch.chdir(paths.subdir)
+    subdir_symbols = set(readonly_index.search("path:./*"))
+    assert subdir_symbols
+    for sym in subdir_symbols:
+        assert str(sym.path).startswith(subdir_prefix)
+    for sym in all_symbols - subdir_symbols:
+        assert not str(sym.path).startswith(subdir_prefix)
+
+
+def test_searching_by_absolute_path(
+    fixture_path, paths, readonly_index, all_symbols, monkeypatch
+):
+    monkeypatch.chdir(fixture_path)
+    # Ensure the path is normalized
+    foo_symbols = set(
+        readonly_index.search(f"path:///{fixture_path}///subdir//foo.c.o")
+    )
+    assert foo_symbols
+    for sym in foo_symbols:
+        assert sym.path == paths.foo
+    for sym in all_symbols - foo_symbols:
+        assert sym.path != paths.foo
 
 
-def test_searching_by_basename(fixture_path, readonly_index):
-    all_symbols = set(readonly_index.search("*:*"))
+def test_searching_by_basename(paths, readonly_index, all_symbols):
     bar_symbols = set(readonly_index.search("path:bar.cpp.o"))
     assert bar_symbols
     for sym in bar_symbols:
-        assert sym.path == fixture_path / "subdir" / "bar.cpp.o"
-    for sym in all_symbols.difference(bar_symbols):
-        assert sym.path != fixture_path / "subdir" / "bar.cpp.o"
+        assert sym.path == paths.bar
+    for sym in all_symbols - bar_symbols:
+        assert sym.path != paths.bar
 
 
 def test_searching_long_name(fixture_path, readonly_index):
@@ -422,8 +401,8 @@ def test_searching_long_name(fixture_path, readonly_index):
 
 
 def test_searching_cxx(readonly_index):
-    symbols = readonly_index.search("cxx func")
-    by_name = {x.name: x for x in symbols}
+    symbols = list(readonly_index.search("cxx func"))
+    by_name = dict(zip(map(attrgetter("name"), symbols), symbols))
 
     sym = by_name["_Z12cxx_functionSt6vectorIiSaIiEE"]
 
@@ -434,145 +413,162 @@ def test_searching_cxx(readonly_index):
     assert sym in readonly_index.search("func vec")
 
 
-def test_tokenize_symbol():
-    tokens = SymbolNameField.tokenize_value("foo")
-    assert tokens == set(
-        [
-            "foo",
-        ]
-    )
-
-    tokens = SymbolNameField.tokenize_value("foo_bar")
-    assert tokens == set(
-        [
-            "bar",
-            "foo",
-        ]
-    )
-
-    tokens = SymbolNameField.tokenize_value("_foo123_bar37_")
-    assert tokens == set(
-        [
-            "foo",
-            "foo123",
-            "123",
-            "bar",
-            "37",
-            "bar37",
-        ]
-    )
-
-    tokens = SymbolNameField.tokenize_value("__foo_bar__")
-    assert tokens == set(
-        [
-            "bar",
-            "foo",
-        ]
-    )
-
-    tokens = SymbolNameField.tokenize_value("FooBarCamelCase")
-    assert tokens == set(
-        [
-            "Bar",
-            "Camel",
-            "Case",
-            "Foo",
-            "FooBarCamelCase",
-            "amel",
-            "ar",
-            "ase",
-            "oo",
-        ]
-    )
-
-    tokens = SymbolNameField.tokenize_value("LSDigitVALUE")
-    assert tokens == set(
-        [
-            "Digit",
-            "LSD",
-            "LSDigitVALUE",
-            "VALUE",
-            "igit",
-        ]
-    )
-
-    tokens = SymbolNameField.tokenize_value(
-        "_Z37cxxFunctionReturningStdVectorOfStringB5cxx11v"
-    )
-    assert tokens == set(
-        [
-            "11",
-            "37",
-            "5",
-            "Function",
-            "Of",
-            "Returning",
-            "Std",
-            "String",
-            "Vector",
-            "Z37",
-            "cxx",
-            "cxx11",
-            "cxxFunctionReturningStdVectorOfStringB",
-            "cxxFunctionReturningStdVectorOfStringB5",
-            "ector",
-            "eturning",
-            "td",
-            "tring",
-            "unction",
-        ]
-    )
-
-    tokens = SymbolNameField.tokenize_value(
-        "_Z39cxxFunctionAcceptingBoostVectorOfStringN5boost9container6vectorINSt7__cxx1112basic_stringIcSt11char_traitsIcESaIcEEEvvEE"
-    )
-    assert tokens == set(
-        [
-            "11",
-            "1112",
-            "39",
-            "5",
-            "6",
-            "7",
-            "9",
-            "Accepting",
-            "Boost",
-            "EE",
-            "EEE",
-            "ES",
-            "Evv",
-            "Function",
-            "INS",
-            "Ic",
-            "Of",
-            "Sa",
-            "St",
-            "String",
-            "Vector",
-            "Z39",
-            "basic",
-            "boost",
-            "boost9",
-            "ccepting",
-            "char",
-            "container",
-            "container6",
-            "cxx",
-            "cxx1112",
-            "cxxFunctionAcceptingBoostVectorOfStringN",
-            "cxxFunctionAcceptingBoostVectorOfStringN5",
-            "ector",
-            "oost",
-            "string",
-            "stringIcSt",
-            "stringIcSt11",
-            "traits",
-            "traitsIcESaIcEEEvvEE",
-            "tring",
-            "unction",
-            "vector",
-            "vectorINSt",
-            "vectorINSt7",
-            "vv",
-        ]
-    )
+TOKENIZE_CASES = [
+    (
+        "foo",
+        frozenset(
+            {
+                "foo",
+            }
+        ),
+    ),
+    (
+        "foo_bar",
+        frozenset(
+            {
+                "bar",
+                "foo",
+            }
+        ),
+    ),
+    (
+        "_foo123_bar37_",
+        frozenset(
+            {
+                "foo",
+                "foo123",
+                "123",
+                "bar",
+                "37",
+                "bar37",
+            }
+        ),
+    ),
+    (
+        "__foo_bar__",
+        frozenset(
+            {
+                "bar",
+                "foo",
+            }
+        ),
+    ),
+    (
+        "FooBarCamelCase",
+        frozenset(
+            {
+                "Bar",
+                "Camel",
+                "Case",
+                "Foo",
+                "FooBarCamelCase",
+                "amel",
+                "ar",
+                "ase",
+                "oo",
+            }
+        ),
+    ),
+    (
+        "LSDigitVALUE",
+        frozenset(
+            {
+                "Digit",
+                "LSD",
+                "LSDigitVALUE",
+                "VALUE",
+                "igit",
+            }
+        ),
+    ),
+    (
+        "_Z37cxxFunctionReturningStdVectorOfStringB5cxx11v",
+        frozenset(
+            {
+                "11",
+                "37",
+                "5",
+                "Function",
+                "Of",
+                "Returning",
+                "Std",
+                "String",
+                "Vector",
+                "Z37",
+                "cxx",
+                "cxx11",
+                "cxxFunctionReturningStdVectorOfStringB",
+                "cxxFunctionReturningStdVectorOfStringB5",
+                "ector",
+                "eturning",
+                "td",
+                "tring",
+                "unction",
+            }
+        ),
+    ),
+    (
+        "_Z39cxxFunctionAcceptingBoostVectorOfStringN5boost9container6vectorINSt7__cxx1112basic_stringIcSt11char_traitsIcESaIcEEEvvEE",
+        frozenset(
+            {
+                "11",
+                "1112",
+                "39",
+                "5",
+                "6",
+                "7",
+                "9",
+                "Accepting",
+                "Boost",
+                "EE",
+                "EEE",
+                "ES",
+                "Evv",
+                "Function",
+                "INS",
+                "Ic",
+                "Of",
+                "Sa",
+                "St",
+                "String",
+                "Vector",
+                "Z39",
+                "basic",
+                "boost",
+                "boost9",
+                "ccepting",
+                "char",
+                "container",
+                "container6",
+                "cxx",
+                "cxx1112",
+                "cxxFunctionAcceptingBoostVectorOfStringN",
+                "cxxFunctionAcceptingBoostVectorOfStringN5",
+                "ector",
+                "oost",
+                "string",
+                "stringIcSt",
+                "stringIcSt11",
+                "traits",
+                "traitsIcESaIcEEEvvEE",
+                "tring",
+                "unction",
+                "vector",
+                "vectorINSt",
+                "vectorINSt7",
+                "vv",
+            }
+        ),
+    ),
+]
+
+
+@pytest.mark.parametrize("symbol,expected_tokens", TOKENIZE_CASES)
+def test_tokenize_symbol(symbol, expected_tokens):
+    assert SymbolNameField.tokenize_value(symbol) == expected_tokens
+
+    terms = SymbolNameField.tokenize_terms(symbol)
+    assert set(terms) == {token.lower() for token in expected_tokens}
+
+    # Indexing the same name again reuses the cached terms
+    assert SymbolNameField.tokenize_terms(symbol) is terms
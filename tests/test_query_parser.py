@@ -1,3 +1,5 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
 from pathlib import Path
 
@@ -6,7 +8,7 @@ import xapian
 
 # isort: off
 from bdx.index import DatabaseField, EnumField, IntegerField, PathField, Schema
-from bdx.query_parser import QueryParser
+from bdx.query_parser import _PARSE_CACHE_SIZE, QueryParser
 
 # isort: on
 from pytest import fixture
@@ -30,18 +32,34 @@ def query_parser():
 
 
 def query_to_tuple(query: xapian.Query):
-    type = query.get_type()
-    num_subqueries = query.get_num_subqueries()
-    subqueries = [query.get_subquery(i) for i in range(num_subqueries)]
-    subqueries = [query_to_tuple(subq) for subq in subqueries]
+    # Walk the tree with an explicit stack, visiting children right to left,
+    # so that the reversed visiting order is a left-to-right post-order and
+    # every node's children are converted before the node itself.
+    visited = []
+    pending = [query]
+    while pending:
+        node = pending.pop()
+        num_subqueries = node.get_num_subqueries()
+        visited.append((node, num_subqueries))
+        get_subquery = node.get_subquery
+        pending.extend(get_subquery(i) for i in range(num_subqueries))
+
+    converted = []
+    for node, num_subqueries in reversed(visited):
+        type = node.get_type()
+        start = len(converted) - num_subqueries
+        subqueries = converted[start:]
+        del converted[start:]
+
+        terms = (
+            list(map(bytes.decode, node))  # pyright: ignore
+            if type == LEAF_TERM or type == WILDCARD
+            else []
+        )
 
-    terms = (
-        [x.decode() for x in query]  # pyright: ignore
-        if type == LEAF_TERM or type == WILDCARD
-        else []
-    )
+        converted.append((type, *subqueries, *terms))
 
-    return (type, *subqueries, *terms)
+    return converted[0]
 
 
 def query_to_str(query: xapian.Query):
@@ -258,6 +276,8 @@ def test_intrange(query_parser):
         query_parser.parse_query("value:1_2")
     with pytest.raises(QueryParser.Error, match="Invalid integer range.*[.]"):
         query_parser.parse_query("value:.")
+    with pytest.raises(QueryParser.Error, match="Invalid integer range.*5g"):
+        query_parser.parse_query("value:1..5g")
 
 
 def test_hex_intrange(query_parser):
@@ -317,6 +337,12 @@ def test_path_field(query_parser):
         (LEAF_TERM, f"XPATH{(Path() / 'FOO').absolute().resolve()}"),
     )
 
+    # Relative paths are resolved again for each query
+    query = query_parser.parse_query("FOO")
+    assert query_parser.parse_query("FOO") is not query
+    query = query_parser.parse_query('path:"/FOO"')
+    assert query_parser.parse_query('path:"/FOO"') is query
+
 
 def test_enumeration_field(query_parser):
     class Enumeration(Enum):
@@ -387,6 +413,7 @@ def test_field_with_no_value(query_parser):
         query_to_tuple(query_parser.parse_query("name: path:baz"))
         == EMPTY_MATCH
     )
+    assert query_parser.parse_query("name:") is query_parser.parse_query("")
     assert query_to_tuple(query_parser.parse_query("name: OR path:baz")) == (
         LEAF_TERM,
         "XPATHbaz",
@@ -602,3 +629,65 @@ def test_missing_closing_paren(query_parser):
         QueryParser.Error, match=r'closing "[)]".*at position 1.*at position 5'
     ):
         assert query_parser.parse_query(" (foo")
+
+
+def test_parsed_queries_are_cached(query_parser):
+    query = query_parser.parse_query("foo bar")
+    assert query_parser.parse_query("foo bar") is query
+
+    query_parser.auto_wildcard = True
+    assert query_parser.parse_query("foo bar") is not query
+
+    query_parser.auto_wildcard = False
+    assert query_parser.parse_query("foo bar") is query
+
+    query_parser.schema = query_parser.schema
+    assert query_parser.parse_query("foo bar") is query
+
+    query_parser.schema = Schema([DatabaseField("name", "XN", key="name")])
+    assert query_to_tuple(query_parser.parse_query("foo")) == (
+        LEAF_TERM,
+        "XNfoo",
+    )
+
+
+def test_parse_cache_evicts_least_recently_used(query_parser):
+    foo = query_parser.parse_query("foo")
+    first = query_parser.parse_query("bar0")
+    for i in range(1, _PARSE_CACHE_SIZE - 1):
+        query_parser.parse_query(f"bar{i}")
+
+    # The cache is full and "foo" is its oldest entry, using it again
+    # makes "bar0" the one evicted next
+    assert query_parser.parse_query("foo") is foo
+    query_parser.parse_query("baz")
+
+    assert query_parser.parse_query("foo") is foo
+    assert query_parser.parse_query("bar0") is not first
+
+
+def test_long_query(query_parser):
+    query = query_parser.parse_query("foo " * 1000 + "OR bar")
+    assert query_to_tuple(query) == (
+        OR,
+        (AND, *[(LEAF_TERM, "XNAMEfoo")] * 1000),
+        (LEAF_TERM, "XNAMEbar"),
+    )
+
+
+def test_parse_query_from_threads(query_parser):
+    queries = [" ".join(f"foo{i}_{j}" for j in range(100)) for i in range(200)]
+
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(query_parser.parse_query, queries))
+    finally:
+        sys.setswitchinterval(switch_interval)
+
+    for i, query in enumerate(results):
+        assert query_to_tuple(query) == (
+            AND,
+            *[(LEAF_TERM, f"XNAMEfoo{i}_{j}") for j in range(100)],
+        )